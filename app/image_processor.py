@@ -2,13 +2,21 @@ import cv2
 import numpy as np
 from typing import Any
 
+# The skew angle is estimated on a 4x downsampled copy of images whose
+# shorter side is at least this many pixels after downsampling
+_DESKEW_MIN_SIDE = 32
+
+# Row and column halves of a 3x3 rectangular structuring element
+_K3_ROW = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 1))
+_K3_COL = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 3))
+
 def preprocess_image(image: np.ndarray) -> np.ndarray:
     if image is None or image.size == 0:
         raise ValueError("Invalid image input")
     if len(image.shape) == 3:
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
-        gray = image.copy()
+        gray = image
     binary = cv2.adaptiveThreshold(
         gray, 
         255, 
@@ -17,20 +25,16 @@ def preprocess_image(image: np.ndarray) -> np.ndarray:
         11, 
         2
     )
-    kernel = np.ones((1, 1), np.uint8)
-    opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-    kernel = np.ones((1, 1), np.uint8)
-    dilated = cv2.dilate(opening, kernel, iterations=1)
     edges = cv2.Canny(gray, 100, 200)
-    combined = cv2.bitwise_and(dilated, cv2.bitwise_not(edges))
-    return combined
+    cv2.subtract(binary, edges, dst=binary)
+    return binary
 
 def enhance_for_tabular_data(image: np.ndarray) -> np.ndarray:
     if len(image.shape) == 3:
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
-        gray = image.copy()
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        gray = image
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0, borderType=cv2.BORDER_REPLICATE)
     binary = cv2.adaptiveThreshold(
         blurred, 
         255, 
@@ -39,22 +43,23 @@ def enhance_for_tabular_data(image: np.ndarray) -> np.ndarray:
         11, 
         2
     )
-    kernel = np.ones((3, 3), np.uint8)
-    dilated = cv2.dilate(binary, kernel, iterations=1)
-    return dilated
+    # A 3x3 rectangular dilation split into a 3x1 and a 1x3 pass
+    dilated = np.empty_like(binary)
+    cv2.dilate(binary, _K3_ROW, dst=dilated)
+    cv2.dilate(dilated, _K3_COL, dst=binary)
+    return binary
 
 def detect_table_regions(image: np.ndarray) -> list:
     enhanced = enhance_for_tabular_data(image)
     contours, _ = cv2.findContours(enhanced, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    table_regions = []
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if area > 1000:
-            x, y, w, h = cv2.boundingRect(contour)
-            aspect_ratio = w / h
-            if aspect_ratio > 0.5 and aspect_ratio < 5:
-                table_regions.append((x, y, w, h))
-    return table_regions
+    if not contours:
+        return []
+    areas = np.array([cv2.contourArea(contour) for contour in contours])
+    rects = np.array([cv2.boundingRect(contour) for contour in contours])
+    w = rects[:, 2]
+    h = rects[:, 3]
+    keep = (areas > 1000) & (w > 0.5 * h) & (w < 5 * h)
+    return [tuple(rect) for rect in rects[keep].tolist()]
 
 def crop_to_roi(image: np.ndarray, x: int, y: int, w: int, h: int) -> np.ndarray:
     return image[y:y+h, x:x+w]
@@ -63,15 +68,20 @@ def deskew_image(image: np.ndarray) -> np.ndarray:
     if len(image.shape) == 3:
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
-        gray = image.copy()
+        gray = image
+    if min(gray.shape[:2]) >= 4 * _DESKEW_MIN_SIDE:
+        gray = cv2.resize(gray, None, fx=0.25, fy=0.25, interpolation=cv2.INTER_AREA)
     _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    coords = np.column_stack(np.where(binary > 0))
-    angle = cv2.minAreaRect(coords)[-1]
+    points = cv2.findNonZero(binary)
+    if points is None:
+        return image
+    # findNonZero yields (x, y); the angle convention below expects (row, col)
+    angle = cv2.minAreaRect(points[:, 0, ::-1])[-1]
     if angle < -45:
         angle = angle + 90
     (h, w) = image.shape[:2]
     center = (w // 2, h // 2)
     rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
     rotated = cv2.warpAffine(image, rotation_matrix, (w, h), 
-                             flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+                             flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
     return rotated
\ No newline at end of file
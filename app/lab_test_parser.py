@@ -1,7 +1,15 @@
 import re
-from typing import List, Dict, Any, Optional
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Dict, Any, Optional, Tuple
 from app.utils import format_lab_test
 
+try:
+    import hyperscan
+except ImportError:  # Optional dependency, fall back to the re module
+    hyperscan = None
+
 class LabTestParser:
     def __init__(self):
         """Initialize the lab test parser with patterns for different lab report formats."""
@@ -16,6 +24,7 @@ class LabTestParser:
             # Pattern 4: Test Name Result: Value Range
             r"([A-Za-z0-9\s\-\+\/]+)\s+Result\s*:\s*([0-9\.]+)\s+([0-9\.<>\-\s\.]+)"
         ]
+        self.patterns = [re.compile(pattern) for pattern in self.patterns]
         
         # Patterns for table-structured data
         self.table_header_patterns = [
@@ -37,6 +46,110 @@ class LabTestParser:
             r"bio\s*reference",
             r"expected\s*range"
         ]
+        
+        # Fuse each header category into a single compiled alternation
+        self.table_header_re = self._compile_alternation(self.table_header_patterns)
+        self.value_header_re = self._compile_alternation(self.value_header_patterns)
+        self.range_header_re = self._compile_alternation(self.range_header_patterns)
+        
+        # Single multi-pattern database for header scanning, if Hyperscan is available
+        self.header_db = self._build_header_db() if hyperscan is not None else None
+        # Hyperscan scratch space can't be shared by concurrent scans, so each thread gets its own
+        self._scratch = threading.local()
+        
+        # Common lab test names used by the aggressive fallback parser, tried in order
+        self.test_name_patterns = [
+            re.compile(r"(Hemoglobin|WBC|RBC|Platelets|Glucose|Cholesterol|HDL|LDL|Triglycerides|Sodium|Potassium|Chloride|Calcium|Magnesium|Creatinine|BUN|ALT|AST|Bilirubin|Albumin|ALP|HbA1c)"),
+            re.compile(r"(TSH|T3|T4|Vitamin D|B12|Folate|Iron|Ferritin)")
+        ]
+        
+        # Fallback for any other "Name:" or "Name =" label
+        self.label_pattern = re.compile(r"([A-Za-z][A-Za-z\s\-]+)(?=\s*[:=])")
+        
+        # Pattern for numbers (potential test values)
+        self.value_pattern = re.compile(r"(\d+\.?\d*)")
+        
+        # Pattern for ranges
+        self.range_pattern = re.compile(r"(\d+\.?\d*\s*[-–]\s*\d+\.?\d*)")
+    
+    @staticmethod
+    def _compile_alternation(patterns: List[str]) -> re.Pattern:
+        """
+        Combine a list of regex patterns into one compiled alternation.
+        
+        Args:
+            patterns: Regex pattern strings
+            
+        Returns:
+            Compiled pattern matching any of the given patterns
+        """
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+    
+    def _build_header_db(self) -> "hyperscan.Database":
+        """
+        Compile all header patterns into one Hyperscan database.
+        
+        Pattern IDs are the header category: 0 for test name, 1 for value
+        and 2 for reference range headers.
+        
+        Returns:
+            Compiled Hyperscan block-mode database
+        """
+        categories = [self.table_header_patterns, self.value_header_patterns, self.range_header_patterns]
+        expressions = []
+        ids = []
+        for category, patterns in enumerate(categories):
+            for pattern in patterns:
+                # Keep matches within a single line, like the per-line re search
+                expressions.append(pattern.replace(r"\s", r"[^\S\n]").encode())
+                ids.append(category)
+        
+        db = hyperscan.Database()
+        db.compile(expressions=expressions, ids=ids, elements=len(expressions), flags=[0] * len(expressions))
+        return db
+    
+    def _scan_headers(self, lowered: List[str]) -> List[Tuple[bool, bool, bool]]:
+        """
+        Check which table header categories appear on each line.
+        
+        Args:
+            lowered: Lowercased lines of extracted text
+            
+        Returns:
+            List of (has_test_header, has_value_header, has_range_header) tuples, one per line
+        """
+        if self.header_db is None:
+            header_flags = []
+            for line_lower in lowered:
+                header_flags.append((
+                    bool(self.table_header_re.search(line_lower)),
+                    bool(self.value_header_re.search(line_lower)),
+                    bool(self.range_header_re.search(line_lower))
+                ))
+            return header_flags
+        
+        # Scan the whole document once and map match offsets back to lines
+        encoded = [line.encode() for line in lowered]
+        line_ends = list(accumulate(len(line) + 1 for line in encoded))
+        header_flags = [[False, False, False] for _ in lowered]
+        
+        def on_match(category, start, end, flags, context):
+            header_flags[bisect_right(line_ends, end - 1)][category] = True
+        
+        self.header_db.scan(b"\n".join(encoded), match_event_handler=on_match, scratch=self._get_scratch())
+        return [tuple(flags) for flags in header_flags]
+    
+    def _get_scratch(self) -> "hyperscan.Scratch":
+        """
+        Get the Hyperscan scratch space for the current thread, creating it on first use.
+        
+        Returns:
+            Scratch space allocated for header_db
+        """
+        scratch = getattr(self._scratch, 'scratch', None)
+        if scratch is None:
+            scratch = self._scratch.scratch = hyperscan.Scratch(self.header_db)
+        return scratch
     
     def parse_text(self, text: str) -> List[Dict[str, Any]]:
         """
@@ -48,32 +161,22 @@ class LabTestParser:
         Returns:
             List of dictionaries containing lab test information
         """
-        lab_tests = []
-        
         # Check if the text appears to be in tabular format
         if self._is_tabular_format(text):
             return self._parse_tabular_format(text)
         
-        # Try each pattern
+        # Try each pattern, collecting (test name, value, reference range) tuples
+        found = []
         for pattern in self.patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                if len(match.groups()) >= 2:
-                    test_name = match.group(1).strip()
-                    value_str = match.group(2).strip()
-                    
-                    # Get reference range if available
-                    reference_range = "N/A"
-                    if len(match.groups()) >= 3 and match.group(3):
-                        reference_range = match.group(3).strip()
-                    
-                    # Format the lab test
-                    lab_test = format_lab_test(test_name, value_str, reference_range)
-                    lab_tests.append(lab_test)
+            for match in pattern.finditer(text):
+                test_name, value_str, reference_range = match.groups()
+                
+                # Reference range is optional in pattern 1
+                found.append((test_name.strip(), value_str.strip(), reference_range.strip() if reference_range else "N/A"))
         
-        # If we found tests, return them
-        if lab_tests:
-            return lab_tests
+        # If we found tests, format and return them
+        if found:
+            return [format_lab_test(test_name, value_str, reference_range) for test_name, value_str, reference_range in found]
         
         # If regular patterns failed, try more aggressive parsing
         return self._parse_aggressive(text)
@@ -91,28 +194,22 @@ class LabTestParser:
         lines = text.split('\n')
         
         # Check for table headers
-        for line in lines:
-            line_lower = line.lower()
-            
-            # Check if line contains table headers
-            has_test_header = any(re.search(pattern, line_lower) for pattern in self.table_header_patterns)
-            has_value_header = any(re.search(pattern, line_lower) for pattern in self.value_header_patterns)
-            
-            if has_test_header and has_value_header:
-                return True
+        if self.header_db is None:
+            # Stop at the first line with both headers
+            for line in lines:
+                line_lower = line.lower()
+                if self.table_header_re.search(line_lower) and self.value_header_re.search(line_lower):
+                    return True
+        else:
+            # One Hyperscan pass classifies every line at once
+            for has_test_header, has_value_header, _ in self._scan_headers(text.lower().split('\n')):
+                if has_test_header and has_value_header:
+                    return True
         
         # Look for consistent delimiters
-        delimiter_counts = {
-            '|': sum(line.count('|') for line in lines),
-            '\t': sum(line.count('\t') for line in lines),
-            ',': sum(line.count(',') for line in lines)
-        }
-        
         # If there are consistent delimiters, it might be tabular
-        if any(count > len(lines) * 1.5 for count in delimiter_counts.values()):
-            return True
-        
-        return False
+        threshold = len(lines) * 1.5
+        return any(text.count(delimiter) > threshold for delimiter in ('|', '\t', ','))
     
     def _parse_tabular_format(self, text: str) -> List[Dict[str, Any]]:
         """
@@ -131,13 +228,12 @@ class LabTestParser:
         header_line_idx = -1
         header_columns = {}
         
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
-            
+        lowered = text.lower().split('\n')
+        header_flags = self._scan_headers(lowered)
+        
+        for i, (line, line_lower) in enumerate(zip(lines, lowered)):
             # Check if this line contains table headers
-            has_test_header = any(re.search(pattern, line_lower) for pattern in self.table_header_patterns)
-            has_value_header = any(re.search(pattern, line_lower) for pattern in self.value_header_patterns)
-            has_range_header = any(re.search(pattern, line_lower) for pattern in self.range_header_patterns)
+            has_test_header, has_value_header, has_range_header = header_flags[i]
             
             if has_test_header and has_value_header:
                 header_line_idx = i
@@ -150,15 +246,15 @@ class LabTestParser:
                 # Try each delimiter
                 for delimiter in potential_delimiters:
                     if delimiter in line:
-                        columns = [col.strip().lower() for col in line.split(delimiter)]
+                        columns = [col.strip() for col in line_lower.split(delimiter)]
                         
                         # Map column indices
                         for j, col in enumerate(columns):
-                            if any(re.search(pattern, col) for pattern in self.table_header_patterns):
+                            if self.table_header_re.search(col):
                                 header_columns['test_name'] = j
-                            elif any(re.search(pattern, col) for pattern in self.value_header_patterns):
+                            elif self.value_header_re.search(col):
                                 header_columns['value'] = j
-                            elif any(re.search(pattern, col) for pattern in self.range_header_patterns):
+                            elif self.range_header_re.search(col):
                                 header_columns['range'] = j
                         
                         # If we found at least test name and value columns, process with this delimiter
@@ -210,7 +306,7 @@ class LabTestParser:
                 columns = line.split('\t')
                 if len(columns) >= 2:
                     # Skip potential header lines
-                    if any(re.search(pattern, columns[0].lower()) for pattern in self.table_header_patterns):
+                    if self.table_header_re.search(columns[0].lower()):
                         continue
                     
                     test_name = columns[test_name_col].strip()
@@ -241,57 +337,26 @@ class LabTestParser:
         lab_tests = []
         lines = text.split('\n')
         
-        # Pattern for test names (common lab test names)
-        test_name_patterns = [
-            r"(Hemoglobin|WBC|RBC|Platelets|Glucose|Cholesterol|HDL|LDL|Triglycerides|Sodium|Potassium|Chloride|Calcium|Magnesium|Creatinine|BUN|ALT|AST|Bilirubin|Albumin|ALP|HbA1c)",
-            r"(TSH|T3|T4|Vitamin D|B12|Folate|Iron|Ferritin)",
-            r"([A-Za-z][A-Za-z\s\-]+)(?=\s*[:=])"
-        ]
-        
-        # Pattern for numbers (potential test values)
-        value_pattern = r"(\d+\.?\d*)"
-        
-        # Pattern for ranges
-        range_pattern = r"(\d+\.?\d*\s*[-–]\s*\d+\.?\d*)"
-        
         for i, line in enumerate(lines):
-            # Skip empty lines
-            if not line.strip():
+            # Try to find a test name (blank lines never match)
+            match = self.test_name_patterns[0].search(line) or self.test_name_patterns[1].search(line)
+            if not match and (':' in line or '=' in line):
+                match = self.label_pattern.search(line)
+            if not match:
                 continue
-                
-            # Try to find a test name
-            test_name = None
-            for pattern in test_name_patterns:
-                match = re.search(pattern, line)
-                if match:
-                    test_name = match.group(1).strip()
-                    break
             
-            if not test_name:
-                continue
-                
-            # Look for a value on this line or the next
-            value_match = re.search(value_pattern, line[match.end():])
-            value_str = None
-            if value_match:
-                value_str = value_match.group(1).strip()
-            elif i + 1 < len(lines) and lines[i + 1].strip():
-                value_match = re.search(value_pattern, lines[i + 1])
-                if value_match:
-                    value_str = value_match.group(1).strip()
+            test_name = match.group(1).strip()
+            next_line = lines[i + 1] if i + 1 < len(lines) else ""
             
-            if not value_str:
+            # Look for a value after the test name on this line, or on the next line
+            value_match = self.value_pattern.search(line, match.end()) or self.value_pattern.search(next_line)
+            if not value_match:
                 continue
-                
-            # Look for a reference range
-            range_match = re.search(range_pattern, line)
-            reference_range = "N/A"
-            if range_match:
-                reference_range = range_match.group(1).strip()
-            elif i + 1 < len(lines) and lines[i + 1].strip():
-                range_match = re.search(range_pattern, lines[i + 1])
-                if range_match:
-                    reference_range = range_match.group(1).strip()
+            value_str = value_match.group(1)
+            
+            # Look for a reference range on this line or the next
+            range_match = self.range_pattern.search(line) or self.range_pattern.search(next_line)
+            reference_range = range_match.group(1).strip() if range_match else "N/A"
             
             # Format the lab test
             lab_test = format_lab_test(test_name, value_str, reference_range)
@@ -324,11 +389,11 @@ class LabTestParser:
         # Check if first row looks like a header
         for j, cell in enumerate(table_data[0]):
             cell_lower = cell.lower()
-            if any(re.search(pattern, cell_lower) for pattern in self.table_header_patterns):
+            if self.table_header_re.search(cell_lower):
                 test_name_col = j
-            elif any(re.search(pattern, cell_lower) for pattern in self.value_header_patterns):
+            elif self.value_header_re.search(cell_lower):
                 value_col = j
-            elif any(re.search(pattern, cell_lower) for pattern in self.range_header_patterns):
+            elif self.range_header_re.search(cell_lower):
                 range_col = j
         
         # If we couldn't identify columns from header, make assumptions
@@ -1,14 +1,21 @@
 # Reintroducing comments to restore the original state
 import os
+import asyncio
+import multiprocessing
 import cv2
 import numpy as np
 import pandas as pd  # Add this import for handling the dataset
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from glob import glob  # Add this import for handling file paths
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from app.image_processor import preprocess_image, detect_table_regions, crop_to_roi, deskew_image
 from app.text_extractor import TextExtractor
@@ -21,11 +28,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Configure OpenCV: keep the optimized (SIMD) code paths enabled and cap its
+# internal thread pool so multiple uvicorn workers don't oversubscribe the CPU.
+# Set CV_THREADS to raise the per-process thread count (default: 1).
+cv2.setUseOptimized(True)
+cv2.setNumThreads(int(os.environ.get("CV_THREADS", 1)))
+
+# Worker processes for batch dataset processing (OCR is CPU-bound), created at startup
+executor: Optional[ProcessPoolExecutor] = None
+
+def _create_executor() -> ProcessPoolExecutor:
+    # Start workers from a clean forkserver (or spawn) process rather than forking
+    # this server, whose OpenCV, OpenMP, Tesseract and to_thread threads could
+    # leave locks held in the children
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=os.cpu_count(), mp_context=multiprocessing.get_context(start_method)
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the dataset worker pool on startup and shut it down on exit."""
+    global executor
+    executor = _create_executor()
+    try:
+        yield
+    finally:
+        executor.shutdown(cancel_futures=True)
+        executor = None
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Lab Report Processor API",
     description="API for extracting lab tests from medical lab reports",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -65,20 +103,20 @@ async def get_lab_tests(file: UploadFile = File(...)):
         # Read image
         contents = await file.read()
         nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = await asyncio.to_thread(cv2.imdecode, nparr, cv2.IMREAD_GRAYSCALE)
         
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid image file")
         
-        # Process the image
-        lab_tests = process_lab_report(image)
+        # Process the image off the event loop
+        lab_tests = await asyncio.to_thread(process_lab_report, image)
         
         # Return response
-        return JSONResponse(content={"is_success": True, "lab_tests": lab_tests})
+        return ORJSONResponse(content={"is_success": True, "lab_tests": lab_tests})
     
     except Exception as e:
         logger.error(f"Error processing lab report: {str(e)}", exc_info=True)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "is_success": False,
@@ -104,8 +142,9 @@ def process_lab_report(image: np.ndarray) -> List[Dict[str, Any]]:
     # Preprocess the image
     processed = preprocess_image(deskewed)
     
-    # Extract text from the entire image
-    full_text = text_extractor.extract_text(processed)
+    # Recognize the entire image once; the text and the word layout are both reused below
+    full_ocr = text_extractor.recognize(processed)
+    full_text = text_extractor.extract_text(full_ocr)
     
     # Parse lab tests from the extracted text
     lab_tests = lab_test_parser.parse_text(full_text)
@@ -124,11 +163,8 @@ def process_lab_report(image: np.ndarray) -> List[Dict[str, Any]]:
     for i, (x, y, w, h) in enumerate(table_regions):
         logger.info(f"Processing table region {i+1}/{len(table_regions)}")
         
-        # Crop to the table region
-        table_image = crop_to_roi(deskewed, x, y, w, h)
-        
-        # Preprocess the table image
-        processed_table = preprocess_image(table_image)
+        # Crop the already preprocessed image to the table region (a view, no copy)
+        processed_table = crop_to_roi(processed, x, y, w, h)
         
         # Try to extract structured table data
         try:
@@ -147,7 +183,7 @@ def process_lab_report(image: np.ndarray) -> List[Dict[str, Any]]:
     if not all_lab_tests:
         logger.info("Attempting structured data extraction from full image")
         try:
-            structured_data = text_extractor.extract_structured_data(processed)
+            structured_data = text_extractor.extract_structured_data(full_ocr)
             
             # Construct text from structured data
             structured_text = "\n".join([line['text'] for line in structured_data])
@@ -157,18 +193,33 @@ def process_lab_report(image: np.ndarray) -> List[Dict[str, Any]]:
         except Exception as e:
             logger.warning(f"Error extracting structured data from full image: {str(e)}")
     
-    # Remove duplicates based on test name
-    unique_lab_tests = []
-    test_names = set()
-    
-    for test in all_lab_tests:
-        if test['test_name'] not in test_names:
-            test_names.add(test['test_name'])
-            unique_lab_tests.append(test)
-    
+    unique_lab_tests = dedupe_lab_tests(all_lab_tests)
     logger.info(f"Extracted {len(unique_lab_tests)} unique lab tests")
     return unique_lab_tests
 
+def dedupe_lab_tests(lab_tests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Remove duplicate lab tests by test name, preferring entries with a reference range.
+    
+    The first entry for a name is kept unless its range is "N/A" and a later
+    duplicate has a real range; the replacement takes the first entry's position.
+    
+    Args:
+        lab_tests: Lab tests in the order they were found
+    
+    Returns:
+        One lab test per test name, in order of first appearance
+    """
+    unique_lab_tests = {}
+    
+    for test in lab_tests:
+        test_name = test['test_name']
+        existing = unique_lab_tests.setdefault(test_name, test)
+        if existing['bio_reference_range'] == "N/A" and test['bio_reference_range'] != "N/A":
+            unique_lab_tests[test_name] = test
+    
+    return list(unique_lab_tests.values())
+
 @app.get("/dataset-info")
 async def dataset_info():
     """
@@ -179,9 +230,56 @@ async def dataset_info():
 # Define the dataset directory
 DATASET_DIR = os.path.join(os.path.dirname(__file__), "..", "dataset", "lab_reports_samples", "lbmaske")
 
-# Get all PNG files in the dataset directory
+# Number of processed dataset files whose results are kept
+DATASET_CACHE_SIZE = 256
+
+# Processed dataset files, keyed by path and reused while (mtime, size) is unchanged.
+# Least recently used entries are evicted past DATASET_CACHE_SIZE; files that
+# failed to process are cached as None so they aren't retried until they change
+dataset_results_cache: "OrderedDict[str, Tuple[Tuple[int, int], Optional[Dict[str, Any]]]]" = OrderedDict()
+
+@lru_cache(maxsize=1)
+def _glob_png_files(dataset_dir: str, dataset_mtime: int) -> List[str]:
+    return glob(os.path.join(dataset_dir, "*.png"))
+
+# Get all PNG files in the dataset directory, re-listing only when the directory changes
 def get_png_files():
-    return glob(os.path.join(DATASET_DIR, "*.png"))
+    try:
+        dataset_mtime = os.stat(DATASET_DIR).st_mtime_ns
+    except OSError:
+        return []
+    return _glob_png_files(DATASET_DIR, dataset_mtime)
+
+def _file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def process_dataset_file(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Process a single dataset image. Runs in a worker process.
+    
+    Args:
+        file_path: Path to the PNG file
+    
+    Returns:
+        Dictionary with the file name and its lab tests, or None if the file could not be processed
+    """
+    try:
+        # Read the image
+        image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            logger.warning(f"Failed to read image: {file_path}")
+            return None
+
+        # Process the image
+        lab_tests = process_lab_report(image)
+        return {"file": os.path.basename(file_path), "lab_tests": lab_tests}
+    except Exception as e:
+        logger.error(f"Error processing file {file_path}: {str(e)}")
+        return None
 
 @app.get("/process-dataset")
 async def process_dataset():
@@ -192,20 +290,57 @@ async def process_dataset():
     if not png_files:
         raise HTTPException(status_code=404, detail="No PNG files found in the dataset directory")
 
-    results = []
+    # Forget files that were deleted or renamed
+    current_files = set(png_files)
+    for file_path in [path for path in dataset_results_cache if path not in current_files]:
+        del dataset_results_cache[file_path]
+
+    # Reuse results for files that haven't changed since they were last processed
+    file_results = {}
+    pending = []
     for file_path in png_files:
-        try:
-            # Read the image
-            image = cv2.imread(file_path)
-            if image is None:
-                logger.warning(f"Failed to read image: {file_path}")
-                continue
-
-            # Process the image
-            lab_tests = process_lab_report(image)
-            results.append({"file": os.path.basename(file_path), "lab_tests": lab_tests})
-        except Exception as e:
-            logger.error(f"Error processing file {file_path}: {str(e)}")
+        signature = _file_signature(file_path)
+        cached = dataset_results_cache.get(file_path)
+        if signature is not None and cached is not None and cached[0] == signature:
+            dataset_results_cache.move_to_end(file_path)
+            file_results[file_path] = cached[1]
+        else:
+            pending.append((file_path, signature))
+
+    # Fan the remaining files out to the process pool without blocking the event loop
+    global executor
+    pool = executor
+    loop = asyncio.get_running_loop()
+
+    async def run_in_pool(file_path: str) -> Optional[Dict[str, Any]]:
+        return await loop.run_in_executor(pool, process_dataset_file, file_path)
+
+    processed = await asyncio.gather(
+        *[run_in_pool(file_path) for file_path, _ in pending], return_exceptions=True
+    )
+
+    # A worker that died (segfault, OOM kill) breaks the whole pool; replace it
+    # so later requests don't keep failing. Another request may already have.
+    if any(isinstance(result, BrokenProcessPool) for result in processed) and executor is pool:
+        logger.error("Dataset worker pool broke, restarting it")
+        pool.shutdown(wait=False, cancel_futures=True)
+        executor = _create_executor()
+
+    for (file_path, signature), result in zip(pending, processed):
+        if isinstance(result, BaseException):
+            # Not cached: the file may only have failed because another one
+            # took the pool down, so it is retried on the next request
+            logger.error(f"Error processing file {file_path}: {result!r}")
+            file_results[file_path] = None
+            continue
+        if signature is not None:
+            dataset_results_cache[file_path] = (signature, result)
+            dataset_results_cache.move_to_end(file_path)
+            if len(dataset_results_cache) > DATASET_CACHE_SIZE:
+                dataset_results_cache.popitem(last=False)
+        file_results[file_path] = result
+
+    results = [file_results[file_path] for file_path in png_files if file_results[file_path] is not None]
 
     return {"processed_files": len(results), "results": results}
 
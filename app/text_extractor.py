@@ -1,161 +1,585 @@
 # Reintroducing comments to restore the original state
+import os
+
+# Run each Tesseract instance single-threaded; parallelism comes from running
+# several instances at once (see TextExtractor.extract_text_batch). Must be set
+# before libtesseract is loaded.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
 import pytesseract
 import cv2
 import numpy as np
+import pandas as pd
+import csv
+import io
 import re
-from typing import List, Dict, Any, Tuple
+import queue
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple, Union
+from PIL import Image
 from pytesseract import Output
 
+try:
+    import tesserocr
+except ImportError:  # Optional dependency, fall back to pytesseract
+    tesserocr = None
+
+# Images whose gray levels span less than this are treated as blank and not OCR'd
+BLANK_CONTRAST_THRESHOLD = 5
+
+# Word boxes and merged lines are kept as structured arrays (one column per
+# field) inside the pipeline; dicts are only built for the public methods
+_BOX_DTYPE = np.dtype([
+    ('text', object),
+    ('confidence', np.float64),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('width', np.int32),
+    ('height', np.int32),
+])
+_LINE_DTYPE = np.dtype([
+    ('text', object),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('width', np.int32),
+    ('height', np.int32),
+])
+
+class OCRResult:
+    """
+    Output of a single Tesseract pass over an image.
+    
+    Returned by TextExtractor.recognize and accepted by the extract_* methods in
+    place of an image, so a caller that needs both the text and the layout of
+    the same image only recognizes it once.
+    """
+    def __init__(self, text: str, boxes: np.ndarray):
+        """
+        Args:
+            text: Extracted text
+            boxes: Structured array of word boxes (_BOX_DTYPE)
+        """
+        self.text = text
+        self.boxes = boxes
+
 class TextExtractor:
-    def __init__(self, lang='eng', config='--psm 6'):
+    def __init__(self, lang='eng', config='--psm 6', use_tesserocr=True, max_workers=None):
         """
         Initialize the text extractor with Tesseract configurations.
         
         Args:
             lang: Language for OCR
             config: Tesseract configuration string
+            use_tesserocr: Keep persistent tesserocr APIs (language model loaded once
+                per API) when tesserocr is installed, instead of running the
+                tesseract binary through pytesseract for every image. Only the --psm
+                option of config is applied to the tesserocr API.
+            max_workers: Maximum number of images recognized at once, which bounds
+                both the tesserocr API pool and the extract_text_batch threads
+                (defaults to the CPU count)
         """
         self.lang = lang
         self.config = config
+        self.use_tesserocr = use_tesserocr and tesserocr is not None
+        self.max_workers = max_workers or os.cpu_count() or 1
+        
+        # tesserocr API objects are not thread-safe, so each OCR call checks one
+        # out of a bounded pool and returns it when done. APIs are created on
+        # demand, up to max_workers, and reused by whichever thread needs one
+        self._api_pool = queue.LifoQueue()
+        self._apis = []
+        self._api_count = 0
+        self._apis_lock = threading.Lock()
+        
+        # Worker threads for extract_text_batch, created on first use
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        
+        if self.use_tesserocr:
+            psm_match = re.search(r"--psm\s+(\d+)", config)
+            self._psm = int(psm_match.group(1)) if psm_match else tesserocr.PSM.AUTO
+            # Load the first model now and fall back to pytesseract if the
+            # language data can't be found
+            try:
+                api = self._create_api()
+            except RuntimeError:
+                self.use_tesserocr = False
+            else:
+                self._api_count = 1
+                self._api_pool.put(api)
+    
+    def _create_api(self) -> "tesserocr.PyTessBaseAPI":
+        """
+        Create a warmed-up tesserocr API and register it for close().
+        
+        Returns:
+            A new API with the language model loaded
+        """
+        api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=self._psm)
+        self._warm_up(api)
+        with self._apis_lock:
+            self._apis.append(api)
+        return api
     
-    def extract_text(self, image: np.ndarray) -> str:
+    def _acquire_api(self) -> "tesserocr.PyTessBaseAPI":
+        """
+        Take an idle API from the pool, creating one if the pool is below
+        max_workers, or waiting for another caller to return one otherwise.
+        
+        Returns:
+            An API for the caller's exclusive use until it is put back
+        """
+        try:
+            return self._api_pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        # Reserve a slot before the slow model load so concurrent callers
+        # can't create more than max_workers APIs
+        with self._apis_lock:
+            can_create = self._api_count < self.max_workers
+            if can_create:
+                self._api_count += 1
+        if not can_create:
+            return self._api_pool.get()
+        
+        try:
+            return self._create_api()
+        except RuntimeError:
+            with self._apis_lock:
+                self._api_count -= 1
+            raise
+    
+    @contextmanager
+    def _checkout_api(self):
+        """Borrow a pooled tesserocr API for the duration of a with block."""
+        api = self._acquire_api()
+        try:
+            yield api
+        finally:
+            self._api_pool.put(api)
+    
+    def _warm_up(self, api: "tesserocr.PyTessBaseAPI"):
+        """
+        Recognize a tiny image so the first real request doesn't pay for
+        Tesseract's lazy recognizer initialization.
+        
+        Only useful with tesserocr: pytesseract starts a new tesseract process
+        for every image, so there is nothing to keep warm.
+        
+        Args:
+            api: API to warm up
+        """
+        # A dark bar keeps the blank-page shortcut from skipping the warm-up
+        image = np.full((64, 64), 255, dtype=np.uint8)
+        image[24:40, 8:56] = 0
+        try:
+            self._run_tesserocr(api, image)
+        except RuntimeError:
+            pass
+    
+    def close(self):
+        """
+        Stop the batch worker threads, release all tesserocr APIs and fall back
+        to pytesseract. Call once no OCR is in flight.
+        """
+        self.use_tesserocr = False
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        with self._apis_lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+            self._api_count = 0
+            self._api_pool = queue.LifoQueue()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def extract_text(self, image: Union[np.ndarray, OCRResult]) -> str:
         """
         Extract text from the preprocessed image using Tesseract OCR.
         
         Args:
-            image: Preprocessed image
+            image: Preprocessed image, or an OCRResult from recognize() to reuse
             
         Returns:
             Extracted text as string
         """
-        text = pytesseract.image_to_string(image, lang=self.lang, config=self.config)
-        return text
+        return self._ocr(image).text
     
-    def extract_text_with_boxes(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def extract_text_batch(self, images: List[np.ndarray]) -> List[str]:
+        """
+        Extract text from several images in parallel.
+        
+        Tesseract is limited to one OpenMP thread per instance (OMP_THREAD_LIMIT=1),
+        since running single-threaded instances side by side scales better than
+        Tesseract's internal parallelism. Tesseract releases the GIL, so a thread
+        pool gives real parallelism. The pool's max_workers threads persist across
+        calls and share the pooled tesserocr APIs, so no model is reloaded per call.
+        
+        Args:
+            images: Preprocessed images
+            
+        Returns:
+            Extracted text for each image, in input order
+        """
+        return list(self._get_executor().map(self.extract_text, images))
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the worker threads for extract_text_batch, creating them on first use.
+        
+        Returns:
+            Thread pool with max_workers threads
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="ocr"
+                )
+            return self._executor
+    
+    def extract_text_with_boxes(self, image: Union[np.ndarray, OCRResult]) -> List[Dict[str, Any]]:
         """
         Extract text with bounding box information.
         
         Args:
-            image: Preprocessed image
+            image: Preprocessed image, or an OCRResult from recognize() to reuse
             
         Returns:
             List of dictionaries containing text and bounding box information
         """
-        # Get data from Tesseract
-        data = pytesseract.image_to_data(
-            image, lang=self.lang, config=self.config, output_type=pytesseract.Output.DICT
+        return self._records_to_dicts(self._ocr(image).boxes)
+    
+    @staticmethod
+    def _records_to_dicts(records: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Convert a structured array into a list of dictionaries.
+        
+        Args:
+            records: Structured array of boxes or lines
+            
+        Returns:
+            One dictionary per record, keyed by field name, with Python values
+        """
+        names = records.dtype.names
+        columns = [records[name].tolist() for name in names]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+    
+    def recognize(self, image: np.ndarray) -> OCRResult:
+        """
+        Run Tesseract once and return both the plain text and the word boxes.
+        
+        Pass the result to the extract_* methods instead of the image to get
+        text, boxes, structured lines or table data without recognizing the
+        image again.
+        
+        Args:
+            image: Preprocessed image
+            
+        Returns:
+            OCRResult with the extracted text and word boxes
+        """
+        gray = self._ensure_gray(image)
+        
+        if self._is_blank(gray):
+            # Nothing for Tesseract to find on an empty or flat page
+            result = ("", np.zeros(0, dtype=_BOX_DTYPE))
+        elif self.use_tesserocr:
+            with self._checkout_api() as api:
+                result = self._run_tesserocr(api, gray)
+        else:
+            # Get data from Tesseract as raw TSV and parse it into typed columns
+            raw = pytesseract.image_to_data(
+                gray, lang=self.lang, config=self.config, output_type=pytesseract.Output.BYTES
+            )
+            data = self._read_tsv(raw)
+            is_word = self._word_mask(data)
+            result = (self._text_from_data(data, is_word), self._boxes_from_data(data, is_word))
+        
+        return OCRResult(*result)
+    
+    def _ocr(self, image: Union[np.ndarray, OCRResult]) -> OCRResult:
+        """
+        Recognize an image, or pass through an existing OCRResult.
+        
+        Args:
+            image: Preprocessed image or OCRResult
+            
+        Returns:
+            OCRResult for the image
+        """
+        if isinstance(image, OCRResult):
+            return image
+        return self.recognize(image)
+    
+    @staticmethod
+    def _is_blank(gray: np.ndarray) -> bool:
+        """
+        Check whether a grayscale image has no content worth recognizing.
+        
+        Args:
+            gray: Grayscale uint8 image
+            
+        Returns:
+            True if the image is empty or its contrast is below BLANK_CONTRAST_THRESHOLD
+        """
+        if gray.size == 0:
+            return True
+        min_val, max_val, _, _ = cv2.minMaxLoc(gray)
+        return max_val - min_val < BLANK_CONTRAST_THRESHOLD
+    
+    @staticmethod
+    def _ensure_gray(image: np.ndarray) -> np.ndarray:
+        """
+        Convert an image to contiguous single-channel uint8 for Tesseract.
+        
+        Grayscale uint8 input (the output of ImageProcessor) is returned as is,
+        so only color images pay for a conversion.
+        
+        Args:
+            image: Input image
+            
+        Returns:
+            Grayscale uint8 image
+        """
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if image.dtype != np.uint8:
+            image = image.astype(np.uint8)
+        return np.ascontiguousarray(image)
+    
+    @staticmethod
+    def _read_tsv(raw: bytes) -> Dict[str, np.ndarray]:
+        """
+        Parse Tesseract TSV output into one array per column.
+        
+        Uses pandas' C parser instead of pytesseract's Output.DICT, which splits
+        the TSV in Python and converts every cell with int(float(...)).
+        
+        Args:
+            raw: Output of image_to_data with Output.BYTES
+            
+        Returns:
+            Dictionary mapping TSV column names to arrays
+        """
+        # Words such as "NA" or "null" must stay text, and quotes are literal
+        frame = pd.read_csv(
+            io.BytesIO(raw), sep='\t', quoting=csv.QUOTE_NONE, engine='c',
+            na_filter=False, dtype={'text': str}
         )
+        return {name: column.to_numpy() for name, column in frame.items()}
+    
+    @staticmethod
+    def _word_mask(data: Dict[str, Any]) -> np.ndarray:
+        """
+        Find the entries of Tesseract image_to_data output that are words.
         
-        # Compile results
-        results = []
+        Args:
+            data: image_to_data columns, as lists or arrays
+            
+        Returns:
+            Boolean mask, False for non-word levels (confidence -1) and empty text
+        """
         n_boxes = len(data['level'])
-        for i in range(n_boxes):
+        confidence = np.asarray(data['conf'], dtype=np.float64)
+        has_text = np.fromiter((bool(text.strip()) for text in data['text']), dtype=bool, count=n_boxes)
+        return (confidence >= 0) & has_text
+    
+    @staticmethod
+    def _boxes_from_data(data: Dict[str, Any], is_word: np.ndarray) -> np.ndarray:
+        """
+        Build the word box array from Tesseract image_to_data output.
+        
+        Args:
+            data: image_to_data columns, as lists or arrays
+            is_word: Mask of the entries to keep, from _word_mask
+            
+        Returns:
+            Structured array of word boxes (_BOX_DTYPE)
+        """
+        n_boxes = len(data['level'])
+        boxes = np.zeros(n_boxes, dtype=_BOX_DTYPE)
+        boxes['text'] = data['text']
+        boxes['confidence'] = data['conf']
+        boxes['x'] = data['left']
+        boxes['y'] = data['top']
+        boxes['width'] = data['width']
+        boxes['height'] = data['height']
+        return boxes[is_word]
+    
+    @staticmethod
+    def _text_from_data(data: Dict[str, Any], is_word: np.ndarray) -> str:
+        """
+        Rebuild plain text from Tesseract image_to_data output.
+        
+        Words on the same line are joined with spaces, lines with newlines, and
+        paragraphs are separated by a blank line, like image_to_string.
+        
+        Args:
+            data: image_to_data columns, as lists or arrays
+            is_word: Mask of the entries to keep, from _word_mask
+            
+        Returns:
+            Extracted text as string
+        """
+        words = np.flatnonzero(is_word)
+        texts = np.asarray(data['text'], dtype=object)[words].tolist()
+        line_keys = zip(*(np.asarray(data[name])[words].tolist() for name in ('block_num', 'par_num', 'line_num')))
+        
+        parts = []
+        current_line = None
+        for line_key, text in zip(line_keys, texts):
+            if line_key == current_line:
+                parts.append(' ')
+            elif current_line is not None:
+                # New line, with a blank line before a new paragraph
+                parts.append('\n' if line_key[:2] == current_line[:2] else '\n\n')
+            current_line = line_key
+            parts.append(text)
+        
+        if parts:
+            parts.append('\n')
+        return "".join(parts)
+    
+    def _run_tesserocr(self, api: "tesserocr.PyTessBaseAPI", image: np.ndarray) -> Tuple[str, np.ndarray]:
+        """
+        Recognize an image with a persistent tesserocr API.
+        
+        Args:
+            api: tesserocr API owned by the current thread
+            image: Preprocessed image
+            
+        Returns:
+            Tuple of (extracted text, structured array of word boxes)
+        """
+        results = []
+        level = tesserocr.RIL.WORD
+        
+        api.SetImage(Image.fromarray(image))
+        api.Recognize()
+        text = api.GetUTF8Text()
+        iterator = api.GetIterator()
+        if iterator is None:
+            return text, np.empty(0, dtype=_BOX_DTYPE)
+        
+        for word in tesserocr.iterate_level(iterator, level):
+            try:
+                word_text = word.GetUTF8Text(level)
+            except RuntimeError:
+                # Raised for pages without any recognized text
+                continue
+            
             # Skip empty text
-            if int(data['conf'][i]) < 0 or not data['text'][i].strip():
+            if not word_text or not word_text.strip():
                 continue
-                
-            results.append({
-                'text': data['text'][i],
-                'confidence': data['conf'][i],
-                'x': data['left'][i],
-                'y': data['top'][i],
-                'width': data['width'][i],
-                'height': data['height'][i]
-            })
+            
+            x1, y1, x2, y2 = word.BoundingBox(level)
+            results.append((word_text, word.Confidence(level), x1, y1, x2 - x1, y2 - y1))
         
-        return results
+        return text, np.array(results, dtype=_BOX_DTYPE)
     
-    def extract_structured_data(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def extract_structured_data(self, image: Union[np.ndarray, OCRResult]) -> List[Dict[str, Any]]:
         """
         Extract structured data from the image by analyzing text layout.
         
         Args:
-            image: Preprocessed image
+            image: Preprocessed image, or an OCRResult from recognize() to reuse
             
         Returns:
             List of structured text blocks with position information
         """
-        # Get text with bounding boxes
-        text_boxes = self.extract_text_with_boxes(image)
+        return self._records_to_dicts(self._structured_lines(self._ocr(image).boxes))
+    
+    def _structured_lines(self, text_boxes: np.ndarray) -> np.ndarray:
+        """
+        Merge the words of each text line into one record.
         
+        Args:
+            text_boxes: Structured array of word boxes
+            
+        Returns:
+            Structured array of lines (_LINE_DTYPE)
+        """
         # Group text by lines based on vertical position
-        lines = self._group_by_lines(text_boxes)
-        
-        # Merge text within each line
-        structured_lines = []
-        for line in lines:
-            line_text = " ".join([box['text'] for box in line])
-            # Get the bounding box for the entire line
-            x = min(box['x'] for box in line)
-            y = min(box['y'] for box in line)
-            width = max(box['x'] + box['width'] for box in line) - x
-            height = max(box['y'] + box['height'] for box in line) - y
-            
-            structured_lines.append({
-                'text': line_text,
-                'x': x,
-                'y': y,
-                'width': width,
-                'height': height
-            })
+        line_boxes, line_starts = self._group_by_lines(text_boxes)
+        structured_lines = np.zeros(len(line_starts), dtype=_LINE_DTYPE)
+        if not line_starts:
+            return structured_lines
+        
+        # Merge text within each line. str.join turns a generator into a list
+        # before joining, so joining list slices directly is the cheaper form
+        texts = line_boxes['text'].tolist()
+        line_ends = line_starts[1:] + [len(texts)]
+        structured_lines['text'] = [" ".join(texts[start:end]) for start, end in zip(line_starts, line_ends)]
+        
+        # Get the bounding box for every line at once, reducing over each
+        # line's run of boxes
+        x = np.minimum.reduceat(line_boxes['x'], line_starts)
+        y = np.minimum.reduceat(line_boxes['y'], line_starts)
+        structured_lines['x'] = x
+        structured_lines['y'] = y
+        structured_lines['width'] = np.maximum.reduceat(line_boxes['x'] + line_boxes['width'], line_starts) - x
+        structured_lines['height'] = np.maximum.reduceat(line_boxes['y'] + line_boxes['height'], line_starts) - y
         
         return structured_lines
     
-    def _group_by_lines(self, text_boxes: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    def _group_by_lines(self, text_boxes: np.ndarray) -> Tuple[np.ndarray, List[int]]:
         """
         Group text boxes by lines based on their vertical position.
         
         Args:
-            text_boxes: List of text boxes with position information
+            text_boxes: Structured array of word boxes
             
         Returns:
-            List of lines, where each line is a list of text boxes
+            Tuple of (the boxes reordered line by line, left to right within
+            each line, and the index where each line starts)
         """
-        if not text_boxes:
-            return []
+        if len(text_boxes) == 0:
+            return text_boxes, []
         
         # Sort by y-coordinate
-        sorted_boxes = sorted(text_boxes, key=lambda box: box['y'])
+        order = np.argsort(text_boxes['y'], kind='stable')
+        sorted_ys = text_boxes['y'][order].tolist()
+        heights = text_boxes['height'][order].tolist()
         
-        lines = []
-        current_line = [sorted_boxes[0]]
+        # A line starts at its topmost box and takes every following box within
+        # half that box's height, so each line's end can be found by binary search
+        line_starts = []
+        start = 0
+        while start < len(sorted_ys):
+            line_starts.append(start)
+            start = bisect_right(sorted_ys, sorted_ys[start] + heights[start] * 0.5, start)
         
-        # Tolerance for considering boxes on the same line
-        line_height = sorted_boxes[0]['height']
-        y_tolerance = line_height * 0.5
+        # Sort boxes by x-coordinate within each line, all lines at once
+        line_lengths = np.diff(line_starts + [len(sorted_ys)])
+        line_ids = np.repeat(np.arange(len(line_starts)), line_lengths)
+        order = order[np.lexsort((text_boxes['x'][order], line_ids))]
         
-        for box in sorted_boxes[1:]:
-            # Check if the box is on the same line as the current line
-            current_y = current_line[0]['y']
-            if abs(box['y'] - current_y) <= y_tolerance:
-                current_line.append(box)
-            else:
-                # Sort boxes in current line by x-coordinate
-                current_line = sorted(current_line, key=lambda b: b['x'])
-                lines.append(current_line)
-                current_line = [box]
-                line_height = box['height']
-                y_tolerance = line_height * 0.5
-        
-        # Add the last line
-        if current_line:
-            current_line = sorted(current_line, key=lambda b: b['x'])
-            lines.append(current_line)
-        
-        return lines
+        return text_boxes[order], line_starts
     
-    def extract_table_data(self, image: np.ndarray) -> List[List[str]]:
+    def extract_table_data(self, image: Union[np.ndarray, OCRResult]) -> List[List[str]]:
         """
         Extract data from a table structure in the image.
         
         Args:
-            image: Preprocessed image containing a table
+            image: Preprocessed image containing a table, or an OCRResult from
+                recognize() to reuse
             
         Returns:
             2D array of table cells (rows and columns)
         """
         # Get structured lines
-        lines = self.extract_structured_data(image)
+        lines = self._structured_lines(self._ocr(image).boxes)
         
         # Detect potential column boundaries based on text alignment
         columns = self._detect_columns(lines)
@@ -164,18 +588,22 @@ class TextExtractor:
         table_data = []
         current_row = [""] * len(columns)
         
-        for line in lines:
-            # Check which column this text belongs to
-            assigned = False
-            for i, (col_start, col_end) in enumerate(columns):
-                if (line['x'] >= col_start - 10 and 
-                    line['x'] < col_end + 10):
-                    current_row[i] = line['text'].strip()
-                    assigned = True
-                    break
+        # Check which column each line belongs to. Column starts and ends both
+        # grow left to right, so the first column whose padded end lies past the
+        # line is the only one that can hold it
+        col_starts = np.array([col_start for col_start, _ in columns])
+        col_ends = np.array([col_end for _, col_end in columns])
+        line_xs = lines['x']
+        col_indices = np.searchsorted(col_ends + 10, line_xs, side='right')
+        assigned = col_indices < len(columns)
+        assigned[assigned] = line_xs[assigned] >= col_starts[col_indices[assigned]] - 10
+        
+        for line_text, i, in_column in zip(lines['text'].tolist(), col_indices.tolist(), assigned.tolist()):
+            if in_column:
+                current_row[i] = line_text.strip()
             
             # If we couldn't assign to a column, this might be a new row
-            if not assigned and any(cell for cell in current_row):
+            elif any(cell for cell in current_row):
                 table_data.append(current_row)
                 current_row = [""] * len(columns)
         
@@ -185,51 +613,46 @@ class TextExtractor:
         
         return table_data
     
-    def _detect_columns(self, lines: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    def _detect_columns(self, lines: np.ndarray) -> List[Tuple[int, int]]:
         """
         Detect potential column boundaries based on text alignment.
         
         Args:
-            lines: List of structured lines
+            lines: Structured array of lines
             
         Returns:
             List of column boundaries as (start_x, end_x) tuples
         """
-        if not lines:
+        if len(lines) == 0:
             return []
         
         # Collect all x-coordinates
-        x_starts = [line['x'] for line in lines]
-        x_ends = [line['x'] + line['width'] for line in lines]
+        x_starts = lines['x'].astype(np.int64)
+        x_ends = x_starts + lines['width']
+        min_x = int(x_starts.min())
+        max_x = int(x_ends.max())
         
         # Use histogram to find clusters of x-coordinates
         # This is a simplified approach; in a real system, you might use
         # more sophisticated clustering algorithms
         hist_bins = 20
-        hist_range = (min(x_starts), max(x_ends))
-        hist, bin_edges = np.histogram(x_starts, bins=hist_bins, range=hist_range)
+        hist, bin_edges = np.histogram(x_starts, bins=hist_bins, range=(min_x, max_x))
         
-        # Find peaks in the histogram
-        peak_indices = []
-        for i in range(1, len(hist) - 1):
-            if hist[i] > hist[i-1] and hist[i] > hist[i+1] and hist[i] > 1:
-                peak_indices.append(i)
+        # Find peaks in the histogram: bins taller than both neighbours and
+        # holding more than one line
+        inner = hist[1:-1]
+        peak_mask = (inner > hist[:-2]) & (inner > hist[2:]) & (inner > 1)
+        peak_indices = np.flatnonzero(peak_mask) + 1
         
         # Convert peak indices to x-coordinates
-        column_starts = [bin_edges[i] for i in peak_indices]
+        column_starts = bin_edges[peak_indices].tolist()
         
         # Add the leftmost position as the first column start
-        if not column_starts or column_starts[0] > min(x_starts) + 20:
-            column_starts = [min(x_starts)] + column_starts
+        if not column_starts or column_starts[0] > min_x + 20:
+            column_starts = [min_x] + column_starts
         
         # Create column boundaries
-        columns = []
-        for i in range(len(column_starts)):
-            start = column_starts[i]
-            if i < len(column_starts) - 1:
-                end = column_starts[i+1] - 1
-            else:
-                end = max(x_ends)
-            columns.append((start, end))
+        column_ends = [start - 1 for start in column_starts[1:]] + [max_x]
+        columns = list(zip(column_starts, column_ends))
         
         return columns
\ No newline at end of file
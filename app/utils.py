@@ -1,6 +1,19 @@
 import re
+from functools import lru_cache
 from typing import Tuple, Union, Dict, List, Any
 
+# Patterns used on every formatted lab test, compiled once at import
+_LT_RE = re.compile(r"<\s*=?\s*(\d+\.?\d*)")
+_GT_RE = re.compile(r">\s*=?\s*(\d+\.?\d*)")
+_UNIT_RE = re.compile(r"[a-zA-Z/%]+")
+_PAREN_TAIL = re.compile(r"\s*\([^)]*\)\s*$")
+_RESULT_TAIL = re.compile(r"\s*-\s*Result\s*$")
+
+# Reports repeat the same few reference ranges across many rows, so parsed
+# ranges and units are memoized (reset with .cache_clear())
+RANGE_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=RANGE_CACHE_SIZE)
 def parse_reference_range(range_str: str) -> Tuple[float, float]:
     """
     Parse reference range string into min and max values.
@@ -29,23 +42,16 @@ def parse_reference_range(range_str: str) -> Tuple[float, float]:
     
     # Case 2: Less than format "< X" or "<= X"
     if "<" in range_str:
-        match = re.search(r"<\s*=?\s*(\d+\.?\d*)", range_str)
+        match = _LT_RE.search(range_str)
         if match:
-            try:
-                max_val = float(match.group(1))
-                return (float("-inf"), max_val)
-            except ValueError:
-                pass
+            # The pattern only captures digits and a dot, so float() cannot fail
+            return (float("-inf"), float(match.group(1)))
     
     # Case 3: Greater than format "> X" or ">= X"
     if ">" in range_str:
-        match = re.search(r">\s*=?\s*(\d+\.?\d*)", range_str)
+        match = _GT_RE.search(range_str)
         if match:
-            try:
-                min_val = float(match.group(1))
-                return (min_val, float("inf"))
-            except ValueError:
-                pass
+            return (float(match.group(1)), float("inf"))
     
     # Default case when parsing fails
     return (0.0, 0.0)
@@ -71,6 +77,20 @@ def is_value_out_of_range(value: float, reference_range: str) -> bool:
     
     return False
 
+@lru_cache(maxsize=RANGE_CACHE_SIZE)
+def _extract_unit(reference_range: str) -> str:
+    """
+    Extract the unit from a reference range string.
+    
+    Args:
+        reference_range: String containing the reference range
+        
+    Returns:
+        First alphabetic token of the range, or "" if there is none
+    """
+    unit_match = _UNIT_RE.search(reference_range)
+    return unit_match.group(0) if unit_match else ""
+
 def clean_test_name(name: str) -> str:
     """
     Clean and standardize test names.
@@ -84,14 +104,9 @@ def clean_test_name(name: str) -> str:
     # Remove extra whitespace
     name = " ".join(name.split())
     
-    
-    patterns_to_remove = [
-        r"\s*\([^)]*\)\s*$",  
-        r"\s*-\s*Result\s*$",  
-    ]
-    
-    for pattern in patterns_to_remove:
-        name = re.sub(pattern, "", name)
+    # Drop a trailing parenthetical, then a trailing "- Result" suffix
+    name = _PAREN_TAIL.sub("", name)
+    name = _RESULT_TAIL.sub("", name)
     
     return name.strip()
 
@@ -115,14 +130,11 @@ def format_lab_test(test_name: str, value_str: str, reference_range: str) -> Dic
         value_formatted = value_str
 
     # Extract unit from the reference range if possible
-    test_unit = ""
-    unit_match = re.search(r"[a-zA-Z/%]+", reference_range)
-    if unit_match:
-        test_unit = unit_match.group(0)
+    test_unit = _extract_unit(reference_range)
+    min_val, max_val = parse_reference_range(reference_range)
 
-    out_of_range = False
-    if isinstance(value, float):
-        out_of_range = is_value_out_of_range(value, reference_range)
+    # Open-ended bounds are +/-inf, so plain comparisons cover every case
+    out_of_range = isinstance(value, float) and (value < min_val or value > max_val)
 
     return {
         "test_name": clean_test_name(test_name),
@@ -1,8 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, dedupe_lab_tests
+import app.main as main
 import os
 import io
+import functools
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image
 import numpy as np
 
@@ -26,17 +31,19 @@ def test_invalid_file_type():
     assert response.status_code == 400
     assert "File must be an image" in response.json()["detail"]
 
+@functools.lru_cache(maxsize=8)
+def _blank_png(size=(800, 600)) -> bytes:
+    """Encode a blank white PNG once per size."""
+    img_byte_arr = io.BytesIO()
+    # compress_level=0 skips zlib, which dominates encoding a synthetic image
+    Image.new('RGB', size, color='white').save(img_byte_arr, format='PNG', compress_level=0)
+    return img_byte_arr.getvalue()
+
 def create_test_image(text="Hemoglobin: 14.2 (12.0-16.0)", size=(800, 600)):
     """Create a simple test image with text."""
-    # Create a blank image
-    image = Image.new('RGB', size, color='white')
-    
-    # Save to bytes
-    img_byte_arr = io.BytesIO()
-    image.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    
-    return img_byte_arr
+    # Reuse the encoded blank image. BytesIO shares the immutable bytes until
+    # written to, so each caller gets its own stream without copying the PNG
+    return io.BytesIO(_blank_png(tuple(size)))
 
 def test_blank_image():
     """Test uploading a blank image."""
@@ -52,6 +59,121 @@ def test_blank_image():
     # Blank image should return empty lab tests
     assert len(response.json()["lab_tests"]) == 0
 
+def _lab_test(name, value, reference_range):
+    return {"test_name": name, "test_value": value, "bio_reference_range": reference_range}
+
+def test_dedupe_prefers_reference_range():
+    """A later duplicate with a range replaces an "N/A" entry in its original position."""
+    lab_tests = [
+        _lab_test("Glucose", 95.0, "N/A"),
+        _lab_test("HDL", 45.0, "40-60"),
+        _lab_test("Glucose", 96.0, "70-110"),
+        _lab_test("Glucose", 97.0, "70-120"),
+    ]
+    
+    assert dedupe_lab_tests(lab_tests) == [
+        _lab_test("Glucose", 96.0, "70-110"),
+        _lab_test("HDL", 45.0, "40-60"),
+    ]
+
+def test_dedupe_keeps_first_entry():
+    """The first entry is kept when it has a range or no duplicate has one."""
+    lab_tests = [
+        _lab_test("HDL", 45.0, "40-60"),
+        _lab_test("LDL", 120.0, "N/A"),
+        _lab_test("HDL", 50.0, "N/A"),
+        _lab_test("LDL", 130.0, "N/A"),
+    ]
+    
+    assert dedupe_lab_tests(lab_tests) == [
+        _lab_test("HDL", 45.0, "40-60"),
+        _lab_test("LDL", 120.0, "N/A"),
+    ]
+    assert dedupe_lab_tests([]) == []
+
+class FakePool(Executor):
+    """Runs work inline; files named in `broken` fail as if their worker died."""
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.is_shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        if os.path.basename(args[0]) in self.broken:
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            future.set_result(fn(*args, **kwargs))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.is_shutdown = True
+
+@pytest.fixture
+def dataset(monkeypatch, tmp_path):
+    """A temporary dataset directory whose files are "processed" by a recording stub."""
+    submitted = []
+
+    def process_dataset_file(file_path):
+        submitted.append(os.path.basename(file_path))
+        return {"file": os.path.basename(file_path), "lab_tests": []}
+
+    monkeypatch.setattr(main, "DATASET_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "process_dataset_file", process_dataset_file)
+    monkeypatch.setattr(main, "dataset_results_cache", OrderedDict())
+    monkeypatch.setattr(main, "executor", None)
+    return tmp_path, submitted
+
+def test_process_dataset_replaces_broken_pool(monkeypatch, dataset):
+    """A dead worker doesn't lose the batch's other results or break later requests."""
+    dataset_dir, submitted = dataset
+    for name in ("a.png", "b.png"):
+        (dataset_dir / name).write_bytes(b"png")
+    broken_pool = FakePool(broken={"a.png"})
+    monkeypatch.setattr(main, "executor", broken_pool)
+    monkeypatch.setattr(main, "_create_executor", FakePool)
+
+    response = client.get("/process-dataset")
+    assert response.status_code == 200
+    assert [result["file"] for result in response.json()["results"]] == ["b.png"]
+    assert broken_pool.is_shutdown
+    assert main.executor is not broken_pool
+
+    # Only the file lost to the broken pool is submitted again
+    response = client.get("/process-dataset")
+    assert response.json()["processed_files"] == 2
+    assert submitted == ["b.png", "a.png"]
+
+def test_process_dataset_cache(monkeypatch, dataset):
+    """Unchanged files are reused, changed ones resubmitted, deleted ones dropped."""
+    dataset_dir, submitted = dataset
+    for name in ("a.png", "b.png", "c.png"):
+        (dataset_dir / name).write_bytes(b"png")
+
+    assert client.get("/process-dataset").json()["processed_files"] == 3
+    assert sorted(submitted) == ["a.png", "b.png", "c.png"]
+
+    submitted.clear()
+    assert client.get("/process-dataset").json()["processed_files"] == 3
+    assert submitted == []
+
+    (dataset_dir / "b.png").write_bytes(b"modified png")
+    (dataset_dir / "c.png").unlink()
+    response = client.get("/process-dataset")
+    assert sorted(result["file"] for result in response.json()["results"]) == ["a.png", "b.png"]
+    assert submitted == ["b.png"]
+    assert sorted(os.path.basename(path) for path in main.dataset_results_cache) == ["a.png", "b.png"]
+
+def test_process_dataset_cache_size(monkeypatch, dataset):
+    """The cache keeps at most DATASET_CACHE_SIZE files."""
+    dataset_dir, submitted = dataset
+    monkeypatch.setattr(main, "DATASET_CACHE_SIZE", 2)
+    for name in ("a.png", "b.png", "c.png"):
+        (dataset_dir / name).write_bytes(b"png")
+
+    for _ in range(2):
+        assert client.get("/process-dataset").json()["processed_files"] == 3
+        assert len(main.dataset_results_cache) == 2
+
 # Optional: Integration test with real image
 # Uncomment and modify if you have test images available
 """
@@ -0,0 +1,49 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from app.lab_test_parser import LabTestParser
+
+HEADER_LINES = [
+    "Test Name        Result     Reference Range",
+    "PARAMETER | VALUE | NORMAL RANGE",
+    "Investigation   Reading   Bio Reference Interval",
+    "Hémoglobine lab test result",  # non-ASCII text shifts byte offsets
+    "test",
+    "name result",  # "test\nname" must not match across lines
+    "",
+    "Glucose 95 70-110 mg/dL",
+    "expected   range",
+]
+
+def test_scan_headers_hyperscan_matches_re():
+    """Hyperscan header scanning gives the same per-line flags as the re fallback."""
+    pytest.importorskip("hyperscan")
+    parser = LabTestParser()
+    fallback = LabTestParser()
+    fallback.header_db = None
+
+    lowered = [line.lower() for line in HEADER_LINES]
+    assert parser.header_db is not None
+    assert parser._scan_headers(lowered) == fallback._scan_headers(lowered)
+
+def test_scan_headers_hyperscan_concurrent():
+    """Concurrent scans on one parser each use their own scratch space."""
+    pytest.importorskip("hyperscan")
+    parser = LabTestParser()
+    fallback = LabTestParser()
+    fallback.header_db = None
+
+    lowered = [line.lower() for line in HEADER_LINES] * 200
+    expected = fallback._scan_headers(lowered)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(parser._scan_headers, [lowered] * 16))
+    assert all(result == expected for result in results)
+
+def test_is_tabular_format_without_hyperscan():
+    """The re fallback detects header lines and delimiters."""
+    parser = LabTestParser()
+    parser.header_db = None
+
+    assert parser._is_tabular_format("Report\nTest Name   Result   Range\nGlucose 95 70-110")
+    assert parser._is_tabular_format("a|b|c\nd|e|f")
+    assert not parser._is_tabular_format("Glucose: 95 (70-110)\nHDL: 45 (40-60)")
@@ -0,0 +1,147 @@
+import time
+import pytest
+import numpy as np
+import pytesseract
+from concurrent.futures import ThreadPoolExecutor
+
+import app.text_extractor as text_extractor
+from app.text_extractor import TextExtractor
+
+TSV_HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+
+# Two paragraphs in one block; OCR words such as "NA" and a stray quote must stay text
+TSV_ROWS = [
+    "1\t1\t0\t0\t0\t0\t0\t0\t400\t200\t-1\t",
+    "2\t1\t1\t0\t0\t0\t10\t10\t300\t130\t-1\t",
+    "3\t1\t1\t1\t0\t0\t10\t10\t300\t50\t-1\t",
+    "4\t1\t1\t1\t1\t0\t10\t10\t300\t20\t-1\t",
+    "5\t1\t1\t1\t1\t1\t10\t10\t60\t20\t96.5\tTest",
+    "5\t1\t1\t1\t1\t2\t80\t12\t60\t18\t95.25\tName",
+    "5\t1\t1\t1\t1\t3\t200\t10\t80\t20\t91\tResult",
+    "4\t1\t1\t1\t2\t0\t10\t40\t300\t20\t-1\t",
+    "5\t1\t1\t1\t2\t1\t10\t40\t90\t20\t90\tGlucose",
+    "5\t1\t1\t1\t2\t2\t120\t41\t30\t19\t88\tNA",
+    "5\t1\t1\t1\t2\t3\t200\t40\t30\t20\t93\t95",
+    "5\t1\t1\t1\t2\t4\t250\t40\t10\t20\t12\t ",
+    "3\t1\t1\t2\t0\t0\t10\t100\t100\t20\t-1\t",
+    "4\t1\t1\t2\t1\t0\t10\t100\t100\t20\t-1\t",
+    "5\t1\t1\t2\t1\t1\t10\t100\t20\t20\t70\t\"q",
+    "5\t1\t1\t2\t1\t2\t40\t100\t40\t20\t85\t7.5",
+]
+
+@pytest.fixture
+def extractor():
+    return TextExtractor(use_tesserocr=False)
+
+@pytest.fixture
+def page():
+    # Any image with contrast, so the blank-page shortcut doesn't skip Tesseract
+    return np.array([[0, 255], [255, 0]], dtype=np.uint8)
+
+def mock_tsv(monkeypatch, tsv):
+    def image_to_data(image, lang=None, config='', output_type=None, **kwargs):
+        assert output_type == pytesseract.Output.BYTES
+        return tsv.encode()
+    monkeypatch.setattr(pytesseract, "image_to_data", image_to_data)
+
+def test_tsv_text_and_boxes(monkeypatch, extractor, page):
+    """Words are kept verbatim, lines joined with newlines and paragraphs with a blank line."""
+    mock_tsv(monkeypatch, TSV_HEADER + "\n".join(TSV_ROWS) + "\n")
+    result = extractor.recognize(page)
+
+    assert result.text == 'Test Name Result\nGlucose NA 95\n\n"q 7.5\n'
+
+    boxes = extractor.extract_text_with_boxes(result)
+    assert [box['text'] for box in boxes] == ["Test", "Name", "Result", "Glucose", "NA", "95", '"q', "7.5"]
+    assert boxes[1] == {'text': "Name", 'confidence': 95.25, 'x': 80, 'y': 12, 'width': 60, 'height': 18}
+
+def test_tsv_structured_and_table_data(monkeypatch, extractor, page):
+    """Words are grouped into lines, and every line lands in the single column."""
+    mock_tsv(monkeypatch, TSV_HEADER + "\n".join(TSV_ROWS) + "\n")
+    result = extractor.recognize(page)
+
+    assert extractor.extract_structured_data(result) == [
+        {'text': "Test Name Result", 'x': 10, 'y': 10, 'width': 270, 'height': 20},
+        {'text': "Glucose NA 95", 'x': 10, 'y': 40, 'width': 220, 'height': 20},
+        {'text': '"q 7.5', 'x': 10, 'y': 100, 'width': 70, 'height': 20},
+    ]
+    assert extractor.extract_table_data(result) == [['"q 7.5']]
+
+def test_tsv_header_only(monkeypatch, extractor, page):
+    """A TSV without rows gives no text, boxes or table."""
+    mock_tsv(monkeypatch, TSV_HEADER)
+    result = extractor.recognize(page)
+
+    assert result.text == ""
+    assert extractor.extract_text_with_boxes(result) == []
+    assert extractor.extract_structured_data(result) == []
+    assert extractor.extract_table_data(result) == []
+
+class FakeAPI:
+    """Stands in for tesserocr.PyTessBaseAPI so the pool can be tested without language data."""
+    instances = []
+    fail_after = None
+
+    def __init__(self, lang=None, psm=None):
+        if FakeAPI.fail_after is not None and len(FakeAPI.instances) >= FakeAPI.fail_after:
+            raise RuntimeError("Failed to init API")
+        self.ended = False
+        FakeAPI.instances.append(self)
+
+    def SetImage(self, image):
+        pass
+
+    def Recognize(self):
+        # Hold the API long enough for concurrent callers to pile up
+        time.sleep(0.005)
+
+    def GetUTF8Text(self):
+        return "text\n"
+
+    def GetIterator(self):
+        return None
+
+    def End(self):
+        self.ended = True
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    pytest.importorskip("tesserocr")
+    monkeypatch.setattr(text_extractor.tesserocr, "PyTessBaseAPI", FakeAPI)
+    monkeypatch.setattr(FakeAPI, "instances", [])
+    monkeypatch.setattr(FakeAPI, "fail_after", None)
+    return FakeAPI
+
+def test_api_pool_bounded(fake_api, page):
+    """Concurrent callers and batches share at most max_workers APIs, and close() ends them."""
+    extractor = TextExtractor(use_tesserocr=True, max_workers=3)
+    assert extractor.use_tesserocr
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        batch = executor.submit(extractor.extract_text_batch, [page] * 32)
+        texts = list(executor.map(extractor.extract_text, [page] * 64))
+    assert texts == ["text\n"] * 64
+    assert batch.result() == ["text\n"] * 32
+    assert len(fake_api.instances) == 3
+    assert extractor._api_count == 3
+
+    extractor.close()
+    assert all(api.ended for api in fake_api.instances)
+    assert extractor._apis == [] and extractor._api_count == 0
+    assert extractor._api_pool.empty()
+    assert extractor._executor is None
+
+def test_api_pool_create_failure(fake_api, page):
+    """A failed model load gives its reserved slot back."""
+    extractor = TextExtractor(use_tesserocr=True, max_workers=2)
+    fake_api.fail_after = 1
+
+    with extractor._checkout_api():
+        # The only API is busy, so this call tries to create a second one
+        with pytest.raises(RuntimeError):
+            extractor.extract_text(page)
+        assert extractor._api_count == 1
+
+    assert extractor.extract_text(page) == "text\n"
+    assert len(fake_api.instances) == 1
+    extractor.close()